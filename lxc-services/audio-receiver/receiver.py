@@ -7,15 +7,23 @@ Supports automatic compression to FLAC or Opus formats for storage efficiency.
 
 import socket
 import struct
+import errno
 import time
 import os
 import sys
 import subprocess
-import threading
+import signal
+import mmap
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import logging
 
+try:
+    import av  # Optional: PyAV encodes in-process instead of spawning ffmpeg per segment
+except ImportError:
+    av = None
+
 # Configuration - MUST match ESP32 firmware settings
 # Aligned with audio-streamer-xiao firmware v2.0:
 # - Sample rate: 16 kHz (reduced from 48 kHz for WiFi streaming)
@@ -31,15 +39,30 @@ DATA_DIR = '/data/audio'
 TCP_PORT = 9000
 TCP_HOST = '0.0.0.0'
 
+# Worker processes accepting ESP32 connections; each worker records one device at a time.
+# With more than one worker, segment filenames include the device IP to keep them apart.
+RECEIVER_WORKERS = 1
+
 # TCP buffer size aligned with firmware (200ms chunks from ESP32)
 TCP_CHUNK_SIZE = 19200   # 9600 samples × 2 bytes = 19200 bytes
 
+# Receive socket tuning
+TCP_RCVBUF_SIZE = 1024 * 1024   # 1 MiB (~30s of audio) absorbs WiFi bursts and slow disk flushes
+
 # Compression Configuration
 # Automatically compress WAV files after segment completion to save storage space
 ENABLE_COMPRESSION = True           # Set to False to disable compression
 COMPRESSION_FORMAT = 'flac'         # Options: 'flac' (lossless ~50% reduction) or 'opus' (lossy ~98% reduction)
 COMPRESSION_DELAY = 10              # Wait 10 seconds after segment completion before compressing
 DELETE_ORIGINAL_WAV = True          # Delete uncompressed WAV after successful compression
+COMPRESSION_WORKERS = 2             # Max segments compressed concurrently (one ffmpeg each)
+
+# Stream compression: pipe raw PCM from the socket straight into ffmpeg while recording,
+# skipping the intermediate WAV (saves ~40 MB of disk writes + reads per segment).
+# Audio is only stored compressed, so a crashed ffmpeg loses the rest of that segment.
+# Falls back to WAV recording if ffmpeg cannot be started.
+STREAM_COMPRESSION = False
+STREAM_WRITE_BATCH = 8              # Chunks (200ms each) buffered per write into ffmpeg's stdin
 
 # Format-specific settings
 # FLAC: Lossless compression, ~50% size reduction (19.2 MB → ~9.6 MB)
@@ -63,31 +86,176 @@ logging.basicConfig(
 )
 logger = logging.getLogger('AudioReceiver')
 
+# Persistent compression workers - completed segments are queued here rather than
+# spawning a thread (and potentially an unbounded number of ffmpegs) per segment
+compression_executor = ThreadPoolExecutor(max_workers=COMPRESSION_WORKERS, thread_name_prefix='Compress')
+
+
+# WAV header for PCM mono audio, packed once at import - every segment starts with
+# the same 44 bytes since all fields derive from the constants above
+WAV_HEADER_STRUCT = struct.Struct('<4sI4s4sIHHIIHH4sI')
+WAV_HEADER = WAV_HEADER_STRUCT.pack(
+    b'RIFF', 36 + SEGMENT_SIZE, b'WAVE',            # RIFF header (file size - 8)
+    b'fmt ', 16, 1,                                 # fmt chunk size, PCM format
+    CHANNELS,                                       # Channels (mono = 1)
+    SAMPLE_RATE,                                    # Sample rate
+    SAMPLE_RATE * CHANNELS * BYTES_PER_SAMPLE,      # Byte rate
+    CHANNELS * BYTES_PER_SAMPLE,                    # Block align
+    BITS_PER_SAMPLE,                                # Bits per sample
+    b'data', SEGMENT_SIZE                           # data chunk size
+)
+WAV_HEADER_SIZE = WAV_HEADER_STRUCT.size            # 44 bytes
+
+SEGMENT_SUFFIXES = ('.wav', '.flac', '.opus')       # Recorded and compressed segment files
+
+
+class PipedSegment:
+    """
+    Segment encoded on the fly by an ffmpeg process reading raw PCM from stdin.
+    Exposes the same write()/flush()/close() calls the receive loop uses for WAV segments.
+    """
+
+    def __init__(self, output_path, format_name, output_args):
+        self.output_path = output_path
+        self.format_name = format_name
+        cmd = [
+            'ffmpeg',
+            '-nostdin',  # Never read terminal commands from stdin (it carries the audio)
+            '-f', 's16le',
+            '-ar', str(SAMPLE_RATE),
+            '-ac', str(CHANNELS),
+            '-i', 'pipe:0',
+            '-y',
+            *output_args,
+            '-loglevel', 'error',
+            str(output_path)
+        ]
+        # stdin buffer holds STREAM_WRITE_BATCH chunks, so ~1.6s of audio reaches ffmpeg
+        # in a single write() syscall instead of one per chunk
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=TCP_CHUNK_SIZE * STREAM_WRITE_BATCH
+        )
+
+    def write(self, data):
+        self.process.stdin.write(data)
+
+    def flush(self):
+        """No-op: buffered PCM is flushed to ffmpeg by close()"""
+
+    def close(self):
+        """Close ffmpeg's input and wait for it to finalize the output file"""
+        try:
+            _, stderr = self.process.communicate(timeout=60)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+            logger.error(f"ffmpeg did not finish {self.output_path.name} within 60s")
+            return
+
+        if self.process.returncode != 0:
+            logger.error(f"Stream compression failed: {stderr.decode(errors='replace').strip()}")
+        elif self.output_path.exists():
+            compressed_size = self.output_path.stat().st_size
+            logger.info(f"  {self.format_name}: {self.output_path.name} ({compressed_size / 1024 / 1024:.2f} MB)")
+
+
+def ffmpeg_output_options():
+    """
+    ffmpeg encoder options for COMPRESSION_FORMAT.
+
+    Returns:
+        (file suffix, format name, ffmpeg output arguments), or None for an unknown format
+    """
+    if COMPRESSION_FORMAT.lower() == 'flac':
+        # FLAC: Lossless compression
+        return '.flac', 'FLAC', [
+            '-compression_level', str(FLAC_COMPRESSION_LEVEL)
+        ]
+
+    if COMPRESSION_FORMAT.lower() == 'opus':
+        # Opus: Lossy compression optimized for speech
+        return '.opus', 'Opus', [
+            '-c:a', 'libopus',
+            '-b:a', f'{OPUS_BITRATE}k',
+            '-vbr', 'on',  # Variable bitrate for better quality
+            '-compression_level', '10',  # Maximum compression efficiency
+            '-application', 'voip'  # Optimized for speech (alternatives: audio, lowdelay)
+        ]
+
+    return None
+
+
+def encode_with_pyav(wav_path, output_path):
+    """
+    Transcode a WAV segment in-process with PyAV (libav* bindings).
+    Uses the same encoder settings as the ffmpeg command line, without the
+    fork/exec and libav initialization of a new ffmpeg process per segment.
+
+    Args:
+        wav_path: Path of the WAV segment to read
+        output_path: Path of the FLAC/Opus file to write
+    """
+    if COMPRESSION_FORMAT.lower() == 'flac':
+        codec_name = 'flac'
+        options = {'compression_level': str(FLAC_COMPRESSION_LEVEL)}
+    else:
+        codec_name = 'libopus'
+        options = {'vbr': 'on', 'compression_level': '10', 'application': 'voip'}
+
+    with av.open(str(wav_path)) as source, av.open(str(output_path), mode='w') as target:
+        stream = target.add_stream(codec_name, rate=SAMPLE_RATE, options=options)
+        stream.layout = 'mono' if CHANNELS == 1 else 'stereo'
+        if codec_name == 'libopus':
+            stream.bit_rate = OPUS_BITRATE * 1000
+
+        # The encoder resamples/regroups frames to its own sample format and frame size
+        for frame in source.decode(audio=0):
+            frame.pts = None
+            for packet in stream.encode(frame):
+                target.mux(packet)
+
+        # Flush frames still buffered in the encoder
+        for packet in stream.encode(None):
+            target.mux(packet)
 
-def write_wav_header(f, data_size):
-    """Write WAV file header for PCM mono audio (16-bit or 24-bit)"""
-    # RIFF header
-    f.write(b'RIFF')
-    f.write(struct.pack('<I', 36 + data_size))  # File size - 8
-    f.write(b'WAVE')
 
-    # fmt chunk
-    f.write(b'fmt ')
-    f.write(struct.pack('<I', 16))  # fmt chunk size
-    f.write(struct.pack('<H', 1))   # PCM format
-    f.write(struct.pack('<H', CHANNELS))  # Channels (mono = 1)
-    f.write(struct.pack('<I', SAMPLE_RATE))  # Sample rate
-    f.write(struct.pack('<I', SAMPLE_RATE * CHANNELS * BYTES_PER_SAMPLE))  # Byte rate
-    f.write(struct.pack('<H', CHANNELS * BYTES_PER_SAMPLE))  # Block align
-    f.write(struct.pack('<H', BITS_PER_SAMPLE))  # Bits per sample (16 or 24)
+def create_segment_file(date_path, filename, suffix):
+    """
+    Create a new, empty segment file that no other recording uses.
+
+    A reconnecting device (or two devices behind one NAT address) can start a segment
+    in the same minute as a recording that is still open in another worker, so the
+    name gets a _1, _2, ... suffix until O_EXCL succeeds. Names whose WAV or compressed
+    counterpart already exists are skipped too, so compression never overwrites an
+    earlier recording.
+
+    Returns:
+        (open file descriptor, path)
+    """
+    for attempt in range(100):
+        stem = filename if attempt == 0 else f'{filename}_{attempt}'
+        if any((date_path / (stem + ext)).exists() for ext in SEGMENT_SUFFIXES if ext != suffix):
+            continue
+
+        path = date_path / (stem + suffix)
+        try:
+            return os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644), path
+        except FileExistsError:
+            continue
+
+    raise FileExistsError(f"No free segment name for {filename}{suffix} in {date_path}")
 
-    # data chunk
-    f.write(b'data')
-    f.write(struct.pack('<I', data_size))
 
+def start_new_segment(client_id=None):
+    """
+    Create new WAV file (or streaming encoder) for next segment
 
-def start_new_segment():
-    """Create new WAV file for next segment"""
+    Args:
+        client_id: Optional device tag appended to the filename (multi-worker mode)
+    """
     now = datetime.now()
     date_dir = now.strftime('%Y-%m-%d')
     date_path = Path(DATA_DIR) / date_dir
@@ -96,22 +264,102 @@ def start_new_segment():
     date_path.mkdir(parents=True, exist_ok=True)
 
     # Generate filename with timestamp
-    filename = now.strftime('%Y-%m-%d_%H%M') + '.wav'
-    filepath = date_path / filename
-
+    filename = now.strftime('%Y-%m-%d_%H%M')
+    if client_id:
+        filename += f'_{client_id}'
+
+    if ENABLE_COMPRESSION and STREAM_COMPRESSION:
+        options = ffmpeg_output_options()
+        if options is None:
+            logger.error(f"Unknown compression format: {COMPRESSION_FORMAT}, recording WAV")
+        else:
+            suffix, format_name, output_args = options
+            fd, output_path = create_segment_file(date_path, filename, suffix)
+            os.close(fd)  # ffmpeg reopens the reserved file
+            try:
+                segment = PipedSegment(output_path, format_name, output_args)
+                logger.info(f"Starting new segment: {output_path} (streaming {format_name})")
+                return segment, SEGMENT_SIZE, output_path
+            except OSError as e:
+                output_path.unlink(missing_ok=True)
+                logger.error(f"Could not start ffmpeg for stream compression ({e}), recording WAV")
+
+    fd, filepath = create_segment_file(date_path, filename, '.wav')
     logger.info(f"Starting new segment: {filepath}")
 
-    # Open file and write WAV header
-    f = open(filepath, 'wb')
-    write_wav_header(f, SEGMENT_SIZE)
+    # Preallocate the whole segment and memory-map it, so each chunk is a memory copy
+    # instead of a write() syscall and the page cache writes it back asynchronously
+    file_size = WAV_HEADER_SIZE + SEGMENT_SIZE
+    try:
+        try:
+            os.posix_fallocate(fd, 0, file_size)
+        except OSError as e:
+            # Filesystem without fallocate support - fall back to a sparse file.
+            # Anything else (ENOSPC, EFBIG) must propagate: storing into an unbacked
+            # page of the mapping would kill the process with SIGBUS.
+            if e.errno not in (errno.EOPNOTSUPP, errno.EINVAL):
+                raise
+            os.ftruncate(fd, file_size)
+        segment_map = mmap.mmap(fd, file_size)
+    finally:
+        os.close(fd)  # mmap keeps its own reference to the file
+
+    segment_map.madvise(mmap.MADV_SEQUENTIAL)
+    segment_map.write(WAV_HEADER)
+
+    return segment_map, SEGMENT_SIZE, filepath
+
+
+def advise_file(filepath, advice):
+    """
+    Pass a posix_fadvise() hint for a whole file (e.g. os.POSIX_FADV_DONTNEED).
+    Hints are best-effort, so failures are only logged.
+    """
+    try:
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        logger.warning(f"posix_fadvise failed for {filepath}: {e}")
+
+
+def finish_segment(segment, filepath, data_size):
+    """
+    Flush a segment to disk and close it.
+    WAV segments cut short (disconnect or shutdown) get their RIFF/data sizes patched
+    and are trimmed to the audio actually received, so players report the real
+    duration and the preallocated tail is not left behind as silence.
+
+    Args:
+        segment: mmap or PipedSegment returned by start_new_segment()
+        filepath: Path of the segment file
+        data_size: Number of audio bytes written after the header
+    """
+    is_wav = isinstance(segment, mmap.mmap)
+    if is_wav and data_size < SEGMENT_SIZE:
+        # The header was written for a full segment - patch both size fields in place
+        struct.pack_into('<I', segment, 4, 36 + data_size)                  # RIFF size (file size - 8)
+        struct.pack_into('<I', segment, WAV_HEADER_SIZE - 4, data_size)    # data chunk size
+
+    segment.flush()
+    segment.close()
+
+    if is_wav:
+        if data_size < SEGMENT_SIZE:
+            os.truncate(filepath, WAV_HEADER_SIZE + data_size)
 
-    return f, SEGMENT_SIZE, filepath
+        # Nothing reads an uncompressed archive back soon, so drop its (now clean)
+        # pages instead of letting 19 MB per segment push useful data out of the cache
+        if not ENABLE_COMPRESSION:
+            advise_file(filepath, os.POSIX_FADV_DONTNEED)
 
 
 def compress_audio(wav_filepath):
     """
     Compress WAV file to FLAC or Opus format using ffmpeg.
-    Runs in background thread after COMPRESSION_DELAY seconds.
+    Runs on compression_executor after COMPRESSION_DELAY seconds.
     Deletes original WAV file after successful compression if DELETE_ORIGINAL_WAV is True.
 
     Args:
@@ -138,53 +386,44 @@ def compress_audio(wav_filepath):
             return
 
         # Determine output format and build ffmpeg command
-        if COMPRESSION_FORMAT.lower() == 'flac':
-            # FLAC: Lossless compression
-            output_path = wav_path.with_suffix('.flac')
-            cmd = [
-                'ffmpeg',
-                '-i', str(wav_path),
-                '-y',  # Overwrite output file if exists
-                '-compression_level', str(FLAC_COMPRESSION_LEVEL),
-                '-loglevel', 'error',  # Only show errors
-                str(output_path)
-            ]
-            format_name = 'FLAC'
-
-        elif COMPRESSION_FORMAT.lower() == 'opus':
-            # Opus: Lossy compression optimized for speech
-            output_path = wav_path.with_suffix('.opus')
-            cmd = [
-                'ffmpeg',
-                '-i', str(wav_path),
-                '-y',
-                '-c:a', 'libopus',
-                '-b:a', f'{OPUS_BITRATE}k',
-                '-vbr', 'on',  # Variable bitrate for better quality
-                '-compression_level', '10',  # Maximum compression efficiency
-                '-application', 'voip',  # Optimized for speech (alternatives: audio, lowdelay)
-                '-loglevel', 'error',
-                str(output_path)
-            ]
-            format_name = 'Opus'
-
-        else:
+        options = ffmpeg_output_options()
+        if options is None:
             logger.error(f"Unknown compression format: {COMPRESSION_FORMAT}")
             return
 
+        suffix, format_name, output_args = options
+        output_path = wav_path.with_suffix(suffix)
+        cmd = [
+            'ffmpeg',
+            '-i', str(wav_path),
+            '-y',  # Overwrite output file if exists
+            *output_args,
+            '-loglevel', 'error',  # Only show errors
+            str(output_path)
+        ]
+
         # Get original file size
         original_size = wav_path.stat().st_size
 
         logger.info(f"Compressing {wav_path.name} to {format_name}...")
 
-        # Run ffmpeg compression
+        # Encode in-process with PyAV when available, otherwise (or on failure) run ffmpeg
         start_time = time.time()
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        compression_time = time.time() - start_time
+        encoded = False
+        if av is not None:
+            try:
+                encode_with_pyav(wav_path, output_path)
+                encoded = True
+            except Exception as e:
+                logger.warning(f"PyAV encoding failed ({e}), falling back to ffmpeg")
 
-        if result.returncode != 0:
-            logger.error(f"Compression failed: {result.stderr}")
-            return
+        if not encoded:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            if result.returncode != 0:
+                logger.error(f"Compression failed: {result.stderr}")
+                return
+
+        compression_time = time.time() - start_time
 
         # Check if output file was created successfully
         if not output_path.exists():
@@ -200,13 +439,19 @@ def compress_audio(wav_filepath):
         logger.info(f"  Compressed: {compressed_size / 1024 / 1024:.2f} MB")
         logger.info(f"  Reduction: {reduction_percent:.1f}% ({compression_time:.1f}s)")
 
-        # Delete original WAV file if configured
+        # The compressed file goes straight to the archive - don't keep it cached
+        advise_file(output_path, os.POSIX_FADV_DONTNEED)
+
+        # Delete original WAV file if configured, otherwise drop its cached pages
+        # (deleting it releases them anyway)
         if DELETE_ORIGINAL_WAV:
             try:
                 wav_path.unlink()
                 logger.info(f"Deleted original WAV: {wav_path.name}")
             except Exception as e:
                 logger.error(f"Failed to delete original WAV: {e}")
+        else:
+            advise_file(wav_path, os.POSIX_FADV_DONTNEED)
 
     except subprocess.TimeoutExpired:
         logger.error(f"Compression timeout (>300s) for {wav_filepath}")
@@ -214,91 +459,129 @@ def compress_audio(wav_filepath):
         logger.error(f"Compression error for {wav_filepath}: {e}")
 
 
-def tcp_server():
-    """Main TCP server loop"""
-    # Create socket
+def create_server_socket():
+    """Create the listening socket shared by all receiver workers"""
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
+    # Only hand a connection to accept() once the ESP32 has sent its first data
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, 5)
+
     # Bind and listen
     sock.bind((TCP_HOST, TCP_PORT))
-    sock.listen(1)
+    sock.listen(RECEIVER_WORKERS)
 
     logger.info(f"Audio receiver listening on {TCP_HOST}:{TCP_PORT}")
     logger.info(f"Saving segments to: {DATA_DIR}")
     logger.info(f"Segment duration: {SEGMENT_DURATION} seconds ({SEGMENT_DURATION // 60} minutes)")
 
+    return sock
+
+
+def tcp_server(sock, worker_id=0):
+    """
+    Main TCP server loop
+
+    Args:
+        sock: Listening socket from create_server_socket()
+        worker_id: Index of this worker process (0 = parent)
+    """
+
+    # Single receive buffer shared by every connection for the lifetime of the server,
+    # so reconnects (WiFi drops, firmware watchdog resets) never allocate a new one
+    recv_buffer = bytearray(TCP_CHUNK_SIZE)
+    recv_view = memoryview(recv_buffer)
+
     while True:
         try:
             # Wait for connection
-            logger.info("Waiting for ESP32 connection...")
+            if RECEIVER_WORKERS > 1:
+                logger.info(f"Worker {worker_id} waiting for ESP32 connection...")
+            else:
+                logger.info("Waiting for ESP32 connection...")
             conn, addr = sock.accept()
             logger.info(f"Connected: {addr}")
 
+            # Separate concurrent devices' segments by IP (dots kept out of the stem)
+            client_id = addr[0].replace('.', '-') if RECEIVER_WORKERS > 1 else None
+
             # Set socket options for optimal streaming
             # TCP_NODELAY: Disable Nagle's algorithm for lower latency (matches ESP32 firmware)
             conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-            # Increase receive buffer to handle 200ms chunks efficiently
+            # TCP_QUICKACK: ACK every chunk immediately so the ESP32 can free its send buffer
+            # (Linux drops back to delayed ACKs, so it is re-armed after each recv below)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+            # Increase receive buffer to absorb WiFi bursts (capped by net.core.rmem_max)
             # ESP32 sends 19200 bytes every 200ms = ~96KB/sec
-            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 65536)
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, TCP_RCVBUF_SIZE)
+
+            # Don't wake the receive loop until a full firmware chunk is queued, so each
+            # recv_into returns a whole 200ms chunk instead of a handful of TCP segments
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVLOWAT, TCP_CHUNK_SIZE)
 
             conn.settimeout(30)  # 30 second timeout (matches firmware watchdog window)
 
             # Start first segment
-            current_file, bytes_left, current_path = start_new_segment()
+            current_segment, bytes_left, current_path = start_new_segment(client_id)
             segment_start_time = time.time()
             total_bytes_received = 0
 
-            while True:
-                try:
-                    # Receive data (aligned with firmware 200ms chunks: 9600 samples × 2 bytes = 19200 bytes)
-                    # Using TCP_CHUNK_SIZE constant for clarity and maintainability
-                    data = conn.recv(TCP_CHUNK_SIZE)
-
-                    if not data:
-                        logger.warning("Connection closed by client")
+            try:
+                while True:
+                    try:
+                        # Receive data (aligned with firmware 200ms chunks: 9600 samples × 2 bytes = 19200 bytes)
+                        # recv_into fills the preallocated buffer in place instead of allocating a new bytes object;
+                        # never read past the end of the current segment so the mapping is filled exactly
+                        received = conn.recv_into(recv_view, min(TCP_CHUNK_SIZE, bytes_left))
+
+                        if received == 0:
+                            logger.warning("Connection closed by client")
+                            break
+
+                        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+                        # Write to current segment
+                        current_segment.write(recv_view[:received])
+                        bytes_left -= received
+                        total_bytes_received += received
+
+                        # Check if segment is complete
+                        if bytes_left <= 0:
+                            segment_duration = time.time() - segment_start_time
+                            logger.info(f"Segment complete: {current_path}")
+                            logger.info(f"  Duration: {segment_duration:.1f}s, Size: {total_bytes_received / 1024 / 1024:.2f} MB")
+
+                            # Detach before finishing, so a shutdown signal landing inside
+                            # finish_segment() can't make the cleanup below finish it twice
+                            finished_segment, current_segment = current_segment, None
+                            finish_segment(finished_segment, current_path, total_bytes_received)
+
+                            # Queue compression on the background workers if enabled
+                            # (stream-compressed segments are already encoded)
+                            if ENABLE_COMPRESSION and not isinstance(finished_segment, PipedSegment):
+                                compression_executor.submit(compress_audio, str(current_path))
+
+                            # Start new segment
+                            current_segment, bytes_left, current_path = start_new_segment(client_id)
+                            segment_start_time = time.time()
+                            total_bytes_received = 0
+
+                    except socket.timeout:
+                        logger.warning("Socket timeout - no data received for 30 seconds")
                         break
-
-                    # Write to current segment
-                    current_file.write(data)
-                    bytes_left -= len(data)
-                    total_bytes_received += len(data)
-
-                    # Check if segment is complete
-                    if bytes_left <= 0:
-                        segment_duration = time.time() - segment_start_time
-                        logger.info(f"Segment complete: {current_path}")
-                        logger.info(f"  Duration: {segment_duration:.1f}s, Size: {total_bytes_received / 1024 / 1024:.2f} MB")
-
-                        current_file.close()
-
-                        # Trigger compression in background thread if enabled
-                        if ENABLE_COMPRESSION:
-                            compression_thread = threading.Thread(
-                                target=compress_audio,
-                                args=(str(current_path),),
-                                daemon=True,
-                                name=f"Compress-{current_path.name}"
-                            )
-                            compression_thread.start()
-
-                        # Start new segment
-                        current_file, bytes_left, current_path = start_new_segment()
-                        segment_start_time = time.time()
-                        total_bytes_received = 0
-
-                except socket.timeout:
-                    logger.warning("Socket timeout - no data received for 30 seconds")
-                    break
-                except Exception as e:
-                    logger.error(f"Error receiving data: {e}")
-                    break
-
-            # Clean up connection
-            current_file.close()
-            conn.close()
-            logger.info("Connection closed")
+                    except Exception as e:
+                        logger.error(f"Error receiving data: {e}")
+                        break
+            finally:
+                # Clean up connection - also runs on shutdown (Ctrl+C / SIGTERM), so a
+                # partial segment is finalized with a header matching its audio
+                if current_segment is not None:
+                    finished_segment, current_segment = current_segment, None
+                    finish_segment(finished_segment, current_path, total_bytes_received)
+                conn.close()
+                logger.info("Connection closed")
 
         except KeyboardInterrupt:
             logger.info("Shutting down...")
@@ -310,12 +593,70 @@ def tcp_server():
     sock.close()
 
 
+def handle_sigterm(signum, frame):
+    """Treat SIGTERM (systemctl stop) like Ctrl+C so the current segment is finalized"""
+    # Only the first SIGTERM/SIGINT interrupts - with several workers, systemd (or the
+    # terminal) and the supervisor both signal each worker, and a second interrupt
+    # would break the segment cleanup
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def run_workers(sock):
+    """
+    Fork RECEIVER_WORKERS receiver processes that all accept on sock and supervise them.
+    A worker that dies (crash, OOM kill) is replaced, so capacity doesn't silently shrink.
+    On shutdown the workers are stopped and reaped.
+    """
+    workers = {}  # pid -> worker id
+
+    try:
+        while True:
+            for worker_id in sorted(set(range(RECEIVER_WORKERS)) - set(workers.values())):
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        tcp_server(sock, worker_id)
+                    finally:
+                        compression_executor.shutdown(wait=True)
+                        os._exit(0)
+                workers[pid] = worker_id
+
+            pid, status = os.wait()
+            worker_id = workers.pop(pid, None)
+            if os.WIFSIGNALED(status):
+                reason = f"killed by {signal.Signals(os.WTERMSIG(status)).name}"
+            else:
+                reason = f"exit code {os.waitstatus_to_exitcode(status)}"
+            logger.error(f"Worker {worker_id} stopped ({reason}), restarting")
+            time.sleep(1)  # Don't respin a crashing worker in a tight loop
+
+    except KeyboardInterrupt:
+        logger.info("Stopping workers...")
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in workers:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+    sock.close()
+
+
 def main():
     """Main entry point"""
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    signal.signal(signal.SIGINT, handle_sigterm)
+
     logger.info("=== Audio Stream Receiver Starting ===")
     logger.info(f"Configuration: {SAMPLE_RATE} Hz, {BITS_PER_SAMPLE}-bit, {CHANNELS} channel(s)")
     logger.info(f"Segment size: {SEGMENT_SIZE / 1024 / 1024:.2f} MB ({SEGMENT_DURATION} seconds)")
-    logger.info(f"Listening on: {TCP_HOST}:{TCP_PORT}")
+    logger.info(f"Listening on: {TCP_HOST}:{TCP_PORT} ({RECEIVER_WORKERS} worker(s))")
 
     # Compression configuration
     if ENABLE_COMPRESSION:
@@ -324,8 +665,15 @@ def main():
             logger.info(f"  Format: FLAC (lossless, ~50% reduction, level {FLAC_COMPRESSION_LEVEL})")
         elif COMPRESSION_FORMAT.lower() == 'opus':
             logger.info(f"  Format: Opus ({OPUS_BITRATE} kbps, ~98% reduction, VoIP optimized)")
-        logger.info(f"  Delay: {COMPRESSION_DELAY}s after segment completion")
-        logger.info(f"  Delete original: {'YES' if DELETE_ORIGINAL_WAV else 'NO'}")
+        if STREAM_COMPRESSION:
+            logger.info("  Mode: streaming (PCM piped into ffmpeg, no intermediate WAV)")
+        else:
+            logger.info(f"  Delay: {COMPRESSION_DELAY}s after segment completion")
+            logger.info(f"  Workers: {COMPRESSION_WORKERS}")
+            logger.info(f"  Delete original: {'YES' if DELETE_ORIGINAL_WAV else 'NO'}")
+
+        if av is not None:
+            logger.info(f"  PyAV: Available ({av.__version__}, in-process encoding)")
 
         # Check if ffmpeg is available
         try:
@@ -350,7 +698,14 @@ def main():
         os.makedirs(DATA_DIR, exist_ok=True)
 
     # Start TCP server
-    tcp_server()
+    sock = create_server_socket()
+
+    # Workers are forked after bind and all block in accept() on the same socket,
+    # so whichever worker is idle picks up the next ESP32
+    if RECEIVER_WORKERS > 1:
+        run_workers(sock)
+    else:
+        tcp_server(sock)
 
 
 if __name__ == '__main__':
@@ -25,22 +25,6 @@ fi
 echo "Running from: $(pwd)"
 echo
 
-# Copy receiver files
-echo "[1/4] Deploying audio receiver..."
-cp audio-receiver/receiver.py /opt/audio-receiver/ # Deployment script for LXC services
-# Run this after setup.sh to deploy the services
-
-set -e
-
-echo "=== Deploying Audio Streaming Services ==="
-echo
-
-# Check if running as root
-if [ "$EUID" -ne 0 ]; then
-    echo "Please run as root"
-    exit 1
-fi
-
 # Copy receiver files
 echo "[1/4] Deploying audio receiver..."
 cp audio-receiver/receiver.py /opt/audio-receiver/
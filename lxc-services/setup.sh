@@ -36,7 +36,7 @@ apt install -y \
 
 # Install Python dependencies
 echo "[3/7] Installing Python dependencies..."
-pip3 install flask>=2.3.0  Flask-HTTPAuth>=4.8.0 Werkzeug>=2.3.0 --break-system-packages
+pip3 install 'flask>=2.3.0' 'Flask-HTTPAuth>=4.8.0' 'Werkzeug>=2.3.0' 'waitress>=2.1.0' --break-system-packages
 
 # Create directories
 echo "[4/7] Creating directories..."
@@ -9,14 +9,30 @@ Aligned with ESP32-S3 audio-streamer-xiao firmware v2.0:
 - HTTP Basic Authentication for secure access
 """
 
-from flask import Flask, render_template, send_file, abort, jsonify, request
+from flask import Flask, Response, render_template, send_file, abort, jsonify
 from flask_httpauth import HTTPBasicAuth
 from werkzeug.security import check_password_hash, generate_password_hash
 from pathlib import Path
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import date, datetime
+from urllib.parse import quote
+import hashlib
 import os
+import re
+import threading
+import time
 import logging
 
+try:
+    from inotify_simple import INotify, flags  # Optional: event-driven /api/stats
+except ImportError:
+    INotify = None
+
+try:
+    import waitress  # Production WSGI server; Flask's dev server is the fallback
+except ImportError:
+    waitress = None
+
 app = Flask(__name__)
 auth = HTTPBasicAuth()
 
@@ -24,17 +40,52 @@ auth = HTTPBasicAuth()
 DATA_DIR = Path('/data/audio')
 PORT = 8080
 HOST = '0.0.0.0'
+SERVER_THREADS = 8       # waitress worker threads (fixed pool instead of a thread per request)
 
 # Audio configuration (matches ESP32 firmware)
 SAMPLE_RATE = 16000      # 16 kHz
 BITS_PER_SAMPLE = 16     # 16-bit
 CHANNELS = 1             # Mono
 SEGMENT_DURATION = 600   # 10 minutes per file
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.opus')
+DATE_FOLDER_RE = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}')  # YYYY-MM-DD
+AUDIO_MIME_TYPES = {
+    '.wav': 'audio/wav',
+    '.flac': 'audio/flac',
+    '.opus': 'audio/opus'
+}
+
+# Directory listing cache
+# Listings are reused while the directory mtime is unchanged; it changes whenever a
+# segment is created, compressed or deleted. File sizes can still change without
+# touching the directory (segment being written), so entries also expire after
+# LISTING_CACHE_TTL.
+LISTING_CACHE_TTL = 30   # seconds
+
+# Background stats rescanner (requires the optional inotify_simple package)
+# Date folders are watched with inotify and only folders with events are rescanned;
+# events are coalesced for STATS_EVENT_DELAY and a full rescan runs every
+# STATS_RESCAN_INTERVAL in case events were lost. Without inotify_simple,
+# /api/stats scans on demand.
+STATS_EVENT_DELAY = 1000      # milliseconds
+STATS_RESCAN_INTERVAL = 300   # seconds
 
 # Authentication credentials from environment variables
 WEB_UI_USERNAME = os.getenv('WEB_UI_USERNAME', 'admin')
 WEB_UI_PASSWORD_HASH = generate_password_hash(os.getenv('WEB_UI_PASSWORD', 'changeme'))
 
+# Successful Basic Auth checks are remembered briefly so repeated requests (UI polling,
+# range requests while playing) skip the deliberately slow password hash. Entries are
+# keyed on a SHA-256 digest of the supplied credentials, never the plaintext.
+AUTH_CACHE_TTL = 60      # seconds
+AUTH_CACHE_SIZE = 64     # max remembered credential digests
+
+# Reverse-proxy file offload (nginx X-Accel-Redirect)
+# When set (e.g. '/protected'), download/stream return an empty response pointing nginx
+# at an internal location aliased to DATA_DIR, and nginx sends the file itself.
+# Leave unset when the UI is not behind a configured nginx (see README).
+X_ACCEL_REDIRECT_PREFIX = os.getenv('WEB_UI_X_ACCEL_PREFIX')
+
 # Logging
 logging.basicConfig(
     level=logging.INFO,
@@ -43,39 +94,105 @@ logging.basicConfig(
 logger = logging.getLogger('AudioWebUI')
 
 
+def is_date_folder(name):
+    """Check for a valid YYYY-MM-DD name (regex + range check, ~4x cheaper than strptime)"""
+    if not DATE_FOLDER_RE.fullmatch(name):
+        return False
+    try:
+        date(int(name[0:4]), int(name[5:7]), int(name[8:10]))
+    except ValueError:
+        return False
+    return True
+
+
+# Listing caches: directory path -> (mtime_ns, expires_at, listing). One entry per
+# directory, overwritten when stale, so expired listings are not kept around.
+_date_folders_cache = {}
+_audio_files_cache = {}
+
+
+def _cached_listing(cache, dir_path, scan):
+    """Return scan(dir_path), reusing the cached result while the directory mtime is
+    unchanged and the entry is younger than LISTING_CACHE_TTL"""
+    try:
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+    except FileNotFoundError:
+        cache.pop(dir_path, None)
+        return None
+
+    now = time.monotonic()
+    entry = cache.get(dir_path)
+    if entry is not None and entry[0] == mtime_ns and entry[1] > now:
+        return entry[2]
+
+    listing = scan(dir_path)
+    cache[dir_path] = (mtime_ns, now + LISTING_CACHE_TTL, listing)
+    return listing
+
+
+def _list_date_folders(dir_path):
+    """List YYYY-MM-DD folders in dir_path"""
+    folders = []
+    # scandir answers is_dir() from the directory entry itself - no stat() per item
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if is_date_folder(entry.name) and entry.is_dir():
+                folders.append(entry.name)
+
+    return tuple(sorted(folders, reverse=True))
+
+
+def _list_audio_files(dir_path):
+    """List audio files in dir_path"""
+    files = []
+    # One stat() per audio file: is_file() comes from the directory entry and
+    # DirEntry.stat() caches its result for both size and mtime
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.is_file():
+                st = entry.stat()
+                files.append({
+                    'name': entry.name,
+                    'size': st.st_size,
+                    'modified': datetime.fromtimestamp(st.st_mtime)
+                })
+
+    return tuple(sorted(files, key=lambda x: x['name']))
+
+
 def get_date_folders():
     """Get list of date folders sorted in descending order"""
-    if not DATA_DIR.exists():
-        return []
+    folders = _cached_listing(_date_folders_cache, str(DATA_DIR), _list_date_folders)
+    if folders is None:
+        folders = ()
 
-    folders = []
-    for item in DATA_DIR.iterdir():
-        if item.is_dir() and len(item.name) == 10:  # YYYY-MM-DD format
-            try:
-                datetime.strptime(item.name, '%Y-%m-%d')
-                folders.append(item.name)
-            except ValueError:
-                continue
+    # Drop listings of folders that are gone (e.g. removed by the cleanup cron job) -
+    # nothing requests them again, so they would otherwise stay cached forever
+    current = {str(DATA_DIR / folder) for folder in folders}
+    for dir_path in list(_audio_files_cache):  # Snapshot: other threads add entries
+        if dir_path not in current:
+            _audio_files_cache.pop(dir_path, None)
 
-    return sorted(folders, reverse=True)
+    return list(folders)
 
 
 def get_audio_files(date_folder):
     """Get list of audio files for a specific date"""
-    folder_path = DATA_DIR / date_folder
-    if not folder_path.exists():
+    files = _cached_listing(_audio_files_cache, str(DATA_DIR / date_folder), _list_audio_files)
+    if files is None:
         return []
 
-    files = []
-    for item in folder_path.iterdir():
-        if item.is_file() and item.suffix.lower() in ['.wav', '.flac', '.opus']:
-            files.append({
-                'name': item.name,
-                'size': item.stat().st_size,
-                'modified': datetime.fromtimestamp(item.stat().st_mtime)
-            })
+    # Copy the cached entries - callers add display fields to them
+    return [dict(f) for f in files]
+
+
+def get_folder_totals(date_folder):
+    """Get (file count, total bytes) for a specific date"""
+    files = _cached_listing(_audio_files_cache, str(DATA_DIR / date_folder), _list_audio_files)
+    if files is None:
+        return 0, 0
 
-    return sorted(files, key=lambda x: x['name'])
+    return len(files), sum(f['size'] for f in files)
 
 
 def format_size(size_bytes):
@@ -95,12 +212,168 @@ def format_duration(filename):
     return f"{minutes}:00"
 
 
+# Stats rescanner state: date folder -> (file count, total bytes)
+_stats_lock = threading.Lock()
+_stats_by_date = {}
+_stats_ready = threading.Event()
+_stats_thread = None
+
+
+def _scan_folder_totals(date_folder):
+    """Uncached (file count, total bytes) for a date folder"""
+    file_count = total_size = 0
+    try:
+        with os.scandir(DATA_DIR / date_folder) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.is_file():
+                    file_count += 1
+                    total_size += entry.stat().st_size
+    except FileNotFoundError:
+        pass
+
+    return file_count, total_size
+
+
+def _stats_rescanner(inotify, root_wd):
+    """Keep _stats_by_date current from inotify events (runs in a daemon thread)"""
+    # No MODIFY: a stream-compressed segment would rescan its folder every second while
+    # recording; CLOSE_WRITE reports the final size once the file is done
+    folder_flags = (flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM |
+                    flags.CLOSE_WRITE)
+    folder_watches = {}  # watch descriptor -> date folder
+    dirty = None         # date folders to rescan, None = everything
+    last_full_scan = 0.0
+
+    while True:
+        if dirty is None:
+            # Full rescan: resync the folder list and per-folder watches
+            folders = get_date_folders()
+            watched = set(folder_watches.values())
+            for folder in folders:
+                if folder not in watched:
+                    try:
+                        folder_watches[inotify.add_watch(str(DATA_DIR / folder), folder_flags)] = folder
+                    except OSError as e:
+                        logger.warning(f"Cannot watch {folder}: {e}")
+
+            totals = {folder: _scan_folder_totals(folder) for folder in folders}
+            with _stats_lock:
+                _stats_by_date.clear()
+                _stats_by_date.update(totals)
+            _stats_ready.set()
+            last_full_scan = time.monotonic()
+        else:
+            totals = {folder: _scan_folder_totals(folder) for folder in dirty}
+            with _stats_lock:
+                _stats_by_date.update(totals)
+
+        # read() returns on the first event, so a steady trickle of events must not
+        # postpone the periodic full rescan - wait only for what is left of the interval
+        remaining = last_full_scan + STATS_RESCAN_INTERVAL - time.monotonic()
+        if remaining <= 0:
+            dirty = None
+            continue
+
+        events = inotify.read(timeout=int(remaining * 1000), read_delay=STATS_EVENT_DELAY)
+        if not events:
+            dirty = None
+            continue
+
+        dirty = set()
+        for event in events:
+            if event.wd == root_wd or event.mask & flags.Q_OVERFLOW:
+                # Date folder added/removed, or events were dropped
+                dirty = None
+                break
+            if event.mask & flags.IGNORED:
+                folder_watches.pop(event.wd, None)
+            elif event.wd in folder_watches:
+                dirty.add(folder_watches[event.wd])
+
+
+def _run_stats_rescanner(inotify, root_wd):
+    """Thread entry point - on failure /api/stats falls back to on-demand scans"""
+    try:
+        _stats_rescanner(inotify, root_wd)
+    except Exception as e:
+        logger.error(f"Stats rescanner stopped: {e}")
+    finally:
+        inotify.close()
+
+
+def start_stats_rescanner():
+    """Start the background stats rescanner if inotify is available"""
+    global _stats_thread
+
+    if INotify is None:
+        logger.info("Stats: inotify_simple not installed, computing on demand")
+        return
+
+    try:
+        inotify = INotify()
+        root_wd = inotify.add_watch(str(DATA_DIR), flags.CREATE | flags.DELETE |
+                                    flags.MOVED_TO | flags.MOVED_FROM)
+    except OSError as e:
+        logger.warning(f"Stats: cannot watch {DATA_DIR} ({e}), computing on demand")
+        return
+
+    _stats_thread = threading.Thread(
+        target=_run_stats_rescanner,
+        args=(inotify, root_wd),
+        daemon=True,
+        name='StatsRescanner'
+    )
+    _stats_thread.start()
+    logger.info("Stats: background rescanner started (inotify)")
+
+
+def send_audio_file(file_path, mimetype, as_attachment=False):
+    """
+    Send an archived audio file.
+    With X_ACCEL_REDIRECT_PREFIX set, nginx serves the file (sendfile, ranges, slow
+    clients) and the worker is released immediately; otherwise Flask sends it.
+    """
+    if X_ACCEL_REDIRECT_PREFIX:
+        relative_path = file_path.relative_to(DATA_DIR).as_posix()
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = quote(f"{X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{relative_path}")
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=file_path.name)
+        return response
+
+    # send_file answers Range and If-None-Match by default (Flask >= 2.2); the file itself
+    # goes through wsgi.file_wrapper, which production servers serve with sendfile(2)
+    return send_file(file_path, mimetype=mimetype, as_attachment=as_attachment)
+
+
+# Auth cache: sha256(username:password) -> time of last successful check (LRU order)
+_auth_cache = OrderedDict()
+_auth_cache_lock = threading.Lock()
+
+
 @auth.verify_password
 def verify_password(username, password):
     """Verify HTTP Basic Auth credentials"""
-    if username == WEB_UI_USERNAME and check_password_hash(WEB_UI_PASSWORD_HASH, password):
-        return username
-    return None
+    if username != WEB_UI_USERNAME:
+        return None
+
+    cache_key = hashlib.sha256(f"{username}:{password}".encode()).digest()
+    now = time.monotonic()
+    with _auth_cache_lock:
+        verified_at = _auth_cache.get(cache_key)
+        if verified_at is not None and now - verified_at < AUTH_CACHE_TTL:
+            _auth_cache.move_to_end(cache_key)
+            return username
+
+    if not check_password_hash(WEB_UI_PASSWORD_HASH, password):
+        return None
+
+    with _auth_cache_lock:
+        _auth_cache[cache_key] = now
+        _auth_cache.move_to_end(cache_key)
+        while len(_auth_cache) > AUTH_CACHE_SIZE:
+            _auth_cache.popitem(last=False)
+    return username
 
 
 @app.route('/')
@@ -116,9 +389,7 @@ def index():
 def date_view(date_folder):
     """View audio files for a specific date"""
     # Validate date format
-    try:
-        datetime.strptime(date_folder, '%Y-%m-%d')
-    except ValueError:
+    if not is_date_folder(date_folder):
         abort(404)
 
     files = get_audio_files(date_folder)
@@ -148,7 +419,8 @@ def download(date_folder, filename):
     except ValueError:
         abort(403)
 
-    return send_file(file_path, as_attachment=True)
+    mimetype = AUDIO_MIME_TYPES.get(file_path.suffix.lower(), 'application/octet-stream')
+    return send_audio_file(file_path, mimetype, as_attachment=True)
 
 
 @app.route('/stream/<date_folder>/<filename>')
@@ -167,31 +439,27 @@ def stream(date_folder, filename):
         abort(403)
 
     # Determine MIME type based on file extension
-    mime_types = {
-        '.wav': 'audio/wav',
-        '.flac': 'audio/flac',
-        '.opus': 'audio/opus'
-    }
-    mimetype = mime_types.get(file_path.suffix.lower(), 'audio/wav')
+    mimetype = AUDIO_MIME_TYPES.get(file_path.suffix.lower(), 'audio/wav')
 
-    return send_file(file_path, mimetype=mimetype)
+    return send_audio_file(file_path, mimetype)
 
 
 @app.route('/api/stats')
 @auth.login_required
 def stats():
     """API endpoint for statistics"""
-    folders = get_date_folders()
-    total_files = 0
-    total_size = 0
+    if _stats_thread is not None and _stats_thread.is_alive() and _stats_ready.is_set():
+        # Maintained by the background rescanner - no filesystem access per request
+        with _stats_lock:
+            totals = list(_stats_by_date.values())
+    else:
+        totals = [get_folder_totals(folder) for folder in get_date_folders()]
 
-    for folder in folders:
-        files = get_audio_files(folder)
-        total_files += len(files)
-        total_size += sum(f['size'] for f in files)
+    total_files = sum(folder_files for folder_files, _ in totals)
+    total_size = sum(folder_size for _, folder_size in totals)
 
     return jsonify({
-        'total_dates': len(folders),
+        'total_dates': len(totals),
         'total_files': total_files,
         'total_size': total_size,
         'total_size_formatted': format_size(total_size)
@@ -230,14 +498,23 @@ if __name__ == '__main__':
     logger.info(f"Audio format: {SAMPLE_RATE} Hz, {BITS_PER_SAMPLE}-bit, {CHANNELS} channel (mono)")
     logger.info(f"Segment duration: {SEGMENT_DURATION // 60} minutes per file")
     logger.info(f"Authentication: enabled (user: {WEB_UI_USERNAME})")
+    if X_ACCEL_REDIRECT_PREFIX:
+        logger.info(f"File transfers: offloaded to nginx via X-Accel-Redirect ({X_ACCEL_REDIRECT_PREFIX})")
     logger.info("Set WEB_UI_USERNAME and WEB_UI_PASSWORD environment variables to configure credentials")
 
     # Ensure data directory exists
     if not DATA_DIR.exists():
         logger.warning(f"Data directory {DATA_DIR} does not exist!")
+    else:
+        start_stats_rescanner()
 
     # Security warning if using default credentials
     if os.getenv('WEB_UI_PASSWORD') is None:
         logger.warning("WARNING: Using default password 'changeme' - set WEB_UI_PASSWORD environment variable!")
 
-    app.run(host=HOST, port=PORT, debug=False, threaded=True)
+    if waitress is not None:
+        logger.info(f"Server: waitress ({SERVER_THREADS} threads)")
+        waitress.serve(app, host=HOST, port=PORT, threads=SERVER_THREADS, asyncore_use_poll=True)
+    else:
+        logger.warning("waitress not installed - using Flask development server (pip install waitress)")
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)